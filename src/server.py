@@ -1,98 +1,428 @@
 from dotenv import load_dotenv
 load_dotenv()
-from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal
+import asyncio
+import asyncpg
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+import redis.asyncio as redis
 from datetime import datetime
+import orjson
 import os
-from decimal import Decimal
+
+logger = logging.getLogger("banking")
+
+
+def start_logging():
+    # Handlers only enqueue records; a background thread does the actual stream I/O
+    # so logging never blocks the event loop. Set up here rather than at import,
+    # since `python server.py` imports this module twice (as __main__ and server).
+    log_queue = SimpleQueue()
+    handler = QueueHandler(log_queue)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, logging.StreamHandler())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener.start()
+    return handler, listener
+
+
+def stop_logging(handler, listener):
+    logger.removeHandler(handler)
+    listener.stop()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_database()
+    log_handler, log_listener = start_logging()
+    app.state.pool = await asyncpg.create_pool(**DB_CONFIG, **POOL_CONFIG)
+    app.state.redis = redis.from_url(REDIS_URL) if REDIS_URL else None
+    try:
+        await init_database(app.state.pool)
+    except Exception:
+        await app.state.pool.close()
+        stop_logging(log_handler, log_listener)
+        raise
+    listener = None
+    if app.state.redis is not None:
+        app.state.cache_set_if_newer = app.state.redis.register_script(CACHE_SET_IF_NEWER)
+        listener = asyncio.create_task(listen_for_balance_changes(app.state.pool))
     yield
+    if listener is not None:
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
+    if app.state.redis is not None:
+        await app.state.redis.aclose()
+    await app.state.pool.close()
+    stop_logging(log_handler, log_listener)
+
+app = FastAPI(
+    title="Banking MCP Server",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+def env(name, default=None):
+    # Keys left blank in .env load as "", which should fall back to the default.
+    return os.getenv(name) or default
 
-app = FastAPI(title="Banking MCP Server", version="1.0.0", lifespan=lifespan)
 
 DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "database": os.getenv("DB_NAME"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "port": os.getenv("DB_PORT")
+    "host": env("DB_HOST"),
+    "database": env("DB_NAME"),
+    "user": env("DB_USER"),
+    "password": env("DB_PASSWORD"),
+    "port": int(env("DB_PORT", "5432"))
+}
+
+POOL_CONFIG = {
+    "min_size": int(env("DB_POOL_MIN_SIZE", "4")),
+    "max_size": int(env("DB_POOL_MAX_SIZE", "20")),
+    "statement_cache_size": int(env("DB_STATEMENT_CACHE_SIZE", "100")),
+    # Writers queueing on a hot account's row lock give up quickly with a 409
+    # instead of holding a connection until the HTTP request times out.
+    "server_settings": {"lock_timeout": env("DB_LOCK_TIMEOUT", "500ms")}
 }
 
+REDIS_URL = env("REDIS_URL")
+BALANCE_CACHE_TTL = int(env("BALANCE_CACHE_TTL", "60"))
+BALANCE_CHANNEL = "balance_changed"
+ACCOUNT_FIELDS = ('account_id', 'account_holder_name', 'balance_cents', 'created_at')
+
+# Cached balances are hashes of {version, body}. An entry is only replaced by a
+# newer balance_version, so a write-through or cache fill that reaches Redis
+# late can't overwrite a fresher balance. An empty body leaves a version-only
+# tombstone, which only the balance of that same version or newer may fill.
+CACHE_SET_IF_NEWER = """
+    local current = tonumber(redis.call('HGET', KEYS[1], 'version'))
+    local version = tonumber(ARGV[1])
+    if current and (current > version or (current == version and redis.call('HEXISTS', KEYS[1], 'body') == 1)) then
+        return 0
+    end
+    if ARGV[2] == '' then
+        redis.call('HDEL', KEYS[1], 'body')
+        redis.call('HSET', KEYS[1], 'version', ARGV[1])
+    else
+        redis.call('HSET', KEYS[1], 'version', ARGV[1], 'body', ARGV[2])
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    return 1
+"""
+
+BULK_COPY_THRESHOLD = 1000
+TRANSACTION_STREAM_CHUNK = 500
+TRANSACTION_PARTITIONS = 16
+SCHEMA_INIT_LOCK_ID = 72_634_001
+MAX_CENTS = 2**63 - 1  # BIGINT
+MAX_BULK_ITEMS = 10000
+
+
+SQL_CREATE_ACCOUNT = """
+    INSERT INTO accounts (account_holder_name, balance_cents)
+    VALUES ($1, $2)
+    RETURNING account_id, account_holder_name, balance_cents, created_at, balance_version
+"""
+
+SQL_INSERT_TRANSACTION = """
+    INSERT INTO transactions (account_id, transaction_type, amount_cents, balance_after_cents)
+    VALUES ($1, $2, $3, $4)
+"""
+
+SQL_DEPOSIT = """
+    WITH upd AS (
+        UPDATE accounts
+        SET balance_cents = balance_cents + $1, balance_version = balance_version + 1
+        WHERE account_id = $2
+        RETURNING account_id, account_holder_name, balance_cents, created_at, balance_version
+    ), ins AS (
+        INSERT INTO transactions (account_id, transaction_type, amount_cents, balance_after_cents)
+        SELECT $2, 'DEPOSIT', $1, balance_cents FROM upd
+    )
+    SELECT account_id, account_holder_name, balance_cents, created_at, balance_version FROM upd
+"""
+
+SQL_WITHDRAW = """
+    WITH upd AS (
+        UPDATE accounts
+        SET balance_cents = balance_cents - $1, balance_version = balance_version + 1
+        WHERE account_id = $2 AND balance_cents >= $1
+        RETURNING account_id, account_holder_name, balance_cents, created_at, balance_version
+    ), ins AS (
+        INSERT INTO transactions (account_id, transaction_type, amount_cents, balance_after_cents)
+        SELECT $2, 'WITHDRAWAL', $1, balance_cents FROM upd
+    )
+    SELECT account_id, account_holder_name, balance_cents, created_at, balance_version FROM upd
+"""
+
+SQL_BULK_UPDATE_BALANCES = """
+    UPDATE accounts
+    SET balance_cents = accounts.balance_cents + v.delta, balance_version = accounts.balance_version + 1
+    FROM (
+        SELECT account_id, SUM(delta)::bigint AS delta
+        FROM unnest($1::int[], $2::bigint[]) AS ops(account_id, delta)
+        GROUP BY account_id
+    ) AS v
+    WHERE accounts.account_id = v.account_id
+    RETURNING accounts.account_id, accounts.account_holder_name, accounts.balance_cents,
+              accounts.created_at, accounts.balance_version,
+              accounts.balance_cents - v.delta AS opening_balance_cents
+"""
+
+SQL_ALLOCATE_ACCOUNT_IDS = """
+    SELECT nextval(pg_get_serial_sequence('accounts', 'account_id'))::int
+    FROM generate_series(1, $1)
+"""
+
+SQL_SELECT_ACCOUNTS = """
+    SELECT account_id, account_holder_name, balance_cents, created_at, balance_version
+    FROM accounts
+    WHERE account_id = ANY($1::int[])
+"""
+
+SQL_ACCOUNT_EXISTS = "SELECT 1 FROM accounts WHERE account_id = $1"
+
+SQL_SELECT_ACCOUNT = """
+    SELECT account_id, account_holder_name, balance_cents, created_at, balance_version
+    FROM accounts
+    WHERE account_id = $1
+"""
+
+SQL_SELECT_BALANCE_CENTS = "SELECT account_balance_cents($1)"
+
+SQL_SELECT_TRANSACTIONS = """
+    SELECT transaction_id, account_id, transaction_type, amount_cents, balance_after_cents, timestamp
+    FROM transactions
+    WHERE account_id = $1
+    ORDER BY timestamp DESC, transaction_id DESC
+    LIMIT $2
+"""
+
+SQL_SELECT_TRANSACTIONS_BEFORE = """
+    SELECT transaction_id, account_id, transaction_type, amount_cents, balance_after_cents, timestamp
+    FROM transactions
+    WHERE account_id = $1 AND (timestamp, transaction_id) < ($2, $3)
+    ORDER BY timestamp DESC, transaction_id DESC
+    LIMIT $4
+"""
+
+SQL_MISSING_COLUMNS = """
+    SELECT expected.table_name || '.' || expected.column_name
+    FROM (VALUES
+        ('accounts', 'balance_cents'),
+        ('accounts', 'balance_version'),
+        ('transactions', 'amount_cents'),
+        ('transactions', 'balance_after_cents')
+    ) AS expected(table_name, column_name)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM information_schema.columns c
+        WHERE c.table_schema = current_schema()
+          AND c.table_name = expected.table_name
+          AND c.column_name = expected.column_name
+    )
+"""
+
+SQL_NOTIFY_BALANCE_CHANGED = """
+    SELECT pg_notify($1, account_id || ':' || balance_version)
+    FROM unnest($2::int[], $3::bigint[]) AS changed(account_id, balance_version)
+"""
+
 
 class AccountCreate(BaseModel):
     account_holder_name: str
-    initial_balance: Decimal = 0.0
+    initial_balance_cents: int = Field(0, ge=0, le=MAX_CENTS)
+
+
+class BulkAccountCreate(BaseModel):
+    accounts: List[AccountCreate] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
 
 
 class TransactionRequest(BaseModel):
     account_id: int
-    amount: Decimal
+    amount_cents: int = Field(..., gt=0, le=MAX_CENTS)
+
+
+class BulkTransactionOp(TransactionRequest):
+    transaction_type: Literal["DEPOSIT", "WITHDRAWAL"]
+
+
+class BulkTransactionRequest(BaseModel):
+    ops: List[BulkTransactionOp] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+    @field_validator("ops")
+    @classmethod
+    def check_total(cls, ops):
+        if sum(op.amount_cents for op in ops) > MAX_CENTS:
+            raise ValueError("total amount_cents is too large")
+        return ops
 
 
 class AccountResponse(BaseModel):
     account_id: int
     account_holder_name: str
-    balance: Decimal
+    balance_cents: int
     created_at: datetime
 
 
-class TransactionResponse(BaseModel):
-    transaction_id: int
-    account_id: int
-    transaction_type: str
-    amount: Decimal
-    balance_after: Decimal
-    timestamp: datetime
+async def init_database(pool):
+    async with pool.acquire() as conn:
+        try:
+            async with conn.transaction():
+                # Every worker runs this at startup; take turns so concurrent DDL
+                # doesn't collide, and wait past the short request lock_timeout.
+                await conn.execute("SET LOCAL lock_timeout = 0")
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_INIT_LOCK_ID)
+
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS accounts (
+                        account_id SERIAL PRIMARY KEY,
+                        account_holder_name VARCHAR(255) NOT NULL,
+                        balance_cents BIGINT NOT NULL DEFAULT 0,
+                        balance_version BIGINT NOT NULL DEFAULT 0,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS transactions (
+                        transaction_id SERIAL,
+                        account_id INTEGER NOT NULL REFERENCES accounts(account_id),
+                        transaction_type VARCHAR(50) NOT NULL,
+                        amount_cents BIGINT NOT NULL,
+                        balance_after_cents BIGINT NOT NULL,
+                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (account_id, transaction_id)
+                    ) PARTITION BY HASH (account_id)
+                """)
+
+                missing = [row[0] for row in await conn.fetch(SQL_MISSING_COLUMNS)]
+                if missing:
+                    raise RuntimeError(
+                        f"Database schema is out of date (missing {', '.join(missing)}); "
+                        "see 'Upgrading an Existing Database' in the README"
+                    )
+
+                if await conn.fetchval("SELECT relkind = 'p' FROM pg_class WHERE oid = 'transactions'::regclass"):
+                    for remainder in range(TRANSACTION_PARTITIONS):
+                        await conn.execute(f"""
+                            CREATE TABLE IF NOT EXISTS transactions_p{remainder}
+                            PARTITION OF transactions
+                            FOR VALUES WITH (MODULUS {TRANSACTION_PARTITIONS}, REMAINDER {remainder})
+                        """)
+                else:
+                    logger.warning(
+                        "transactions table predates hash partitioning; "
+                        "see 'Upgrading an Existing Database' in the README to partition it"
+                    )
+
+                await conn.execute("""
+                    CREATE OR REPLACE FUNCTION account_balance_cents(p_account_id INTEGER)
+                    RETURNS BIGINT
+                    LANGUAGE sql STABLE
+                    AS $$ SELECT balance_cents FROM accounts WHERE account_id = p_account_id $$
+                """)
+
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_tx_account_ts
+                    ON transactions (account_id, timestamp DESC, transaction_id DESC)
+                    INCLUDE (transaction_type, amount_cents, balance_after_cents)
+                """)
+
+            logger.info("Database tables initialized successfully")
+        except Exception:
+            logger.exception("Error initializing database")
+            raise
 
 
-def get_db_connection():
+def balance_cache_key(account_id):
+    return f"bal:{account_id}"
+
+
+async def get_cached_account_json(account_id):
+    if app.state.redis is None:
+        return None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
+        cached = await app.state.redis.hget(balance_cache_key(account_id), 'body')
+    except redis.RedisError as e:
+        logger.warning("Error reading cached balance for account %s: %s", account_id, e)
+        return None
+    return cached
+
+
+async def cache_accounts(*accounts):
+    if app.state.redis is None:
+        return
+    try:
+        async with app.state.redis.pipeline(transaction=False) as pipe:
+            for account in accounts:
+                await app.state.cache_set_if_newer(
+                    keys=[balance_cache_key(account['account_id'])],
+                    args=[
+                        account['balance_version'],
+                        orjson.dumps({key: account[key] for key in ACCOUNT_FIELDS}),
+                        BALANCE_CACHE_TTL
+                    ],
+                    client=pipe
+                )
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Error caching balances: %s", e)
+
+
+async def notify_balance_changed(conn, accounts):
+    # Delivered by PostgreSQL only when the surrounding transaction commits.
+    if app.state.redis is None:
+        return
+    await conn.execute(
+        SQL_NOTIFY_BALANCE_CHANGED,
+        BALANCE_CHANNEL,
+        [account['account_id'] for account in accounts],
+        [account['balance_version'] for account in accounts]
+    )
 
 
-def init_database():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+async def invalidate_cached_balance(connection, pid, channel, payload):
+    account_id, balance_version = payload.split(':')
     try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS accounts (
-                account_id SERIAL PRIMARY KEY,
-                account_holder_name VARCHAR(255) NOT NULL,
-                balance DECIMAL(15, 2) DEFAULT 0.00,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS transactions (
-                transaction_id SERIAL PRIMARY KEY,
-                account_id INTEGER REFERENCES accounts(account_id),
-                transaction_type VARCHAR(50) NOT NULL,
-                amount DECIMAL(15, 2) NOT NULL,
-                balance_after DECIMAL(15, 2) NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        conn.commit()
-        print("Database tables initialized successfully")
-    except Exception as e:
-        conn.rollback()
-        print(f"Error initializing database: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
+        # Drops anything older than this version without letting a late fill of
+        # an older balance back in.
+        await app.state.cache_set_if_newer(
+            keys=[balance_cache_key(account_id)],
+            args=[balance_version, '', BALANCE_CACHE_TTL]
+        )
+    except redis.RedisError as e:
+        logger.warning("Error invalidating cached balance for account %s: %s", account_id, e)
+
+
+async def listen_for_balance_changes(pool):
+    delay = 1
+    while True:
+        try:
+            async with pool.acquire() as conn:
+                lost = asyncio.Event()
+                on_terminate = lambda connection: lost.set()
+                conn.add_termination_listener(on_terminate)
+                await conn.add_listener(BALANCE_CHANNEL, invalidate_cached_balance)
+                delay = 1
+                try:
+                    await lost.wait()
+                except asyncio.CancelledError:
+                    # Shutting down with the connection still open; hand it back clean.
+                    conn.remove_termination_listener(on_terminate)
+                    await conn.remove_listener(BALANCE_CHANNEL, invalidate_cached_balance)
+                    raise
+            logger.warning("Balance change listener connection lost, reconnecting in %ss", delay)
+        except Exception:
+            logger.exception("Error listening for balance changes, retrying in %ss", delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 30)
 
 
 @app.get("/")
@@ -102,9 +432,12 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "create_account": "/accounts/create",
+            "bulk_create_accounts": "/accounts/bulk",
             "deposit": "/accounts/deposit",
             "withdraw": "/accounts/withdraw",
+            "bulk_transactions": "/accounts/transactions/bulk",
             "balance": "/accounts/{account_id}/balance",
+            "balance_only": "/accounts/{account_id}/balance_only",
             "transactions": "/accounts/{account_id}/transactions"
         }
     }
@@ -112,196 +445,293 @@ async def root():
 
 @app.post("/accounts/create", response_model=AccountResponse)
 async def create_account(account: AccountCreate):
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
     try:
-        if account.initial_balance < 0:
-            raise HTTPException(status_code=400, detail="Initial balance cannot be negative")
-        
-        cursor.execute("""
-            INSERT INTO accounts (account_holder_name, balance)
-            VALUES (%s, %s)
-            RETURNING account_id, account_holder_name, balance, created_at
-        """, (account.account_holder_name, account.initial_balance))
-        
-        new_account = cursor.fetchone()
-        
-        if account.initial_balance > 0:
-            cursor.execute("""
-                INSERT INTO transactions (account_id, transaction_type, amount, balance_after)
-                VALUES (%s, %s, %s, %s)
-            """, (new_account['account_id'], 'DEPOSIT', account.initial_balance, account.initial_balance))
-        
-        conn.commit()
-        return new_account
-        
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=f"Error creating account: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
+        async with app.state.pool.acquire() as conn:
+            async with conn.transaction():
+                new_account = await conn.fetchrow(
+                    SQL_CREATE_ACCOUNT, account.account_holder_name, account.initial_balance_cents
+                )
+
+                if account.initial_balance_cents > 0:
+                    await conn.execute(
+                        SQL_INSERT_TRANSACTION,
+                        new_account['account_id'], 'DEPOSIT', account.initial_balance_cents, account.initial_balance_cents
+                    )
+
+        await cache_accounts(new_account)
+        return dict(new_account)
+
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error creating account")
+        raise HTTPException(status_code=500, detail="Error creating account")
+
+
+@app.post("/accounts/bulk", response_model=List[AccountResponse])
+async def bulk_create_accounts(payload: BulkAccountCreate):
+    try:
+        async with app.state.pool.acquire() as conn:
+            async with conn.transaction():
+                # Reserve the SERIAL ids up front so both tables can be loaded with COPY.
+                account_ids = [
+                    row[0] for row in await conn.fetch(SQL_ALLOCATE_ACCOUNT_IDS, len(payload.accounts))
+                ]
+
+                await conn.copy_records_to_table(
+                    'accounts',
+                    records=[
+                        (account_id, account.account_holder_name, account.initial_balance_cents)
+                        for account_id, account in zip(account_ids, payload.accounts)
+                    ],
+                    columns=['account_id', 'account_holder_name', 'balance_cents']
+                )
+
+                opening_deposits = [
+                    (account_id, 'DEPOSIT', account.initial_balance_cents, account.initial_balance_cents)
+                    for account_id, account in zip(account_ids, payload.accounts)
+                    if account.initial_balance_cents > 0
+                ]
+                if opening_deposits:
+                    await conn.copy_records_to_table(
+                        'transactions',
+                        records=opening_deposits,
+                        columns=['account_id', 'transaction_type', 'amount_cents', 'balance_after_cents']
+                    )
+
+                rows = {row['account_id']: dict(row) for row in await conn.fetch(SQL_SELECT_ACCOUNTS, account_ids)}
+
+        new_accounts = [rows[account_id] for account_id in account_ids]
+        await cache_accounts(*new_accounts)
+        return new_accounts
+
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error creating accounts")
+        raise HTTPException(status_code=500, detail="Error creating accounts")
 
 
 @app.post("/accounts/deposit")
 async def deposit(transaction: TransactionRequest):
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
     try:
-        if transaction.amount <= 0:
-            raise HTTPException(status_code=400, detail="Deposit amount must be positive")
-        
-        cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (transaction.account_id,))
-        account = cursor.fetchone()
-        
-        if not account:
-            raise HTTPException(status_code=404, detail="Account not found")
-        
-        new_balance = account['balance'] + transaction.amount
-        
-        cursor.execute("""
-            UPDATE accounts
-            SET balance = %s 
-            WHERE account_id = %s
-        """, (new_balance, transaction.account_id))
-        
-        cursor.execute("""
-            INSERT INTO transactions (account_id, transaction_type, amount, balance_after)
-            VALUES (%s, %s, %s, %s)
-        """, (transaction.account_id, 'DEPOSIT', transaction.amount, new_balance))
-        
-        conn.commit()
-        
+        async with app.state.pool.acquire() as conn:
+            async with conn.transaction():
+                account = await conn.fetchrow(SQL_DEPOSIT, transaction.amount_cents, transaction.account_id)
+
+                if account is None:
+                    raise HTTPException(status_code=404, detail="Account not found")
+
+                await notify_balance_changed(conn, [account])
+
+        await cache_accounts(account)
+
         return {
             "message": "Deposit successful",
             "account_id": transaction.account_id,
-            "amount_deposited": transaction.amount,
-            "new_balance": new_balance
+            "amount_deposited_cents": transaction.amount_cents,
+            "new_balance_cents": account['balance_cents']
         }
-        
+
     except HTTPException:
-        conn.rollback()
         raise
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=f"Error processing deposit: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
+    except (asyncpg.LockNotAvailableError, asyncpg.QueryCanceledError):
+        raise HTTPException(status_code=409, detail="Account busy, retry")
+    except asyncpg.NumericValueOutOfRangeError:
+        raise HTTPException(status_code=422, detail="Balance would exceed the maximum")
+    except Exception:
+        logger.exception("Error processing deposit")
+        raise HTTPException(status_code=500, detail="Error processing deposit")
 
 
 @app.post("/accounts/withdraw")
 async def withdraw(transaction: TransactionRequest):
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
     try:
-        if transaction.amount <= 0:
-            raise HTTPException(status_code=400, detail="Withdrawal amount must be positive")
-        
-        cursor.execute("SELECT balance FROM accounts WHERE account_id = %s", (transaction.account_id,))
-        account = cursor.fetchone()
-        
-        if not account:
-            raise HTTPException(status_code=404, detail="Account not found")
-        
-        if float(account['balance']) < transaction.amount:
-            raise HTTPException(status_code=400, detail="Insufficient funds")
-        
-        new_balance = account['balance'] - transaction.amount
-        
-        cursor.execute("""
-            UPDATE accounts 
-            SET balance = %s 
-            WHERE account_id = %s
-        """, (new_balance, transaction.account_id))
-        
-        cursor.execute("""
-            INSERT INTO transactions (account_id, transaction_type, amount, balance_after)
-            VALUES (%s, %s, %s, %s)
-        """, (transaction.account_id, 'WITHDRAWAL', transaction.amount, new_balance))
-        
-        conn.commit()
-        
+        async with app.state.pool.acquire() as conn:
+            async with conn.transaction():
+                account = await conn.fetchrow(SQL_WITHDRAW, transaction.amount_cents, transaction.account_id)
+
+                if account is None:
+                    if not await conn.fetchval(SQL_ACCOUNT_EXISTS, transaction.account_id):
+                        raise HTTPException(status_code=404, detail="Account not found")
+                    raise HTTPException(status_code=400, detail="Insufficient funds")
+
+                await notify_balance_changed(conn, [account])
+
+        await cache_accounts(account)
+
         return {
             "message": "Withdrawal successful",
             "account_id": transaction.account_id,
-            "amount_withdrawn": transaction.amount,
-            "new_balance": new_balance
+            "amount_withdrawn_cents": transaction.amount_cents,
+            "new_balance_cents": account['balance_cents']
         }
-        
+
     except HTTPException:
-        conn.rollback()
         raise
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=f"Error processing withdrawal: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
+    except (asyncpg.LockNotAvailableError, asyncpg.QueryCanceledError):
+        raise HTTPException(status_code=409, detail="Account busy, retry")
+    except Exception:
+        logger.exception("Error processing withdrawal")
+        raise HTTPException(status_code=500, detail="Error processing withdrawal")
+
+
+@app.post("/accounts/transactions/bulk")
+async def bulk_transactions(payload: BulkTransactionRequest):
+    try:
+        account_ids = [op.account_id for op in payload.ops]
+        deltas = [op.amount_cents if op.transaction_type == 'DEPOSIT' else -op.amount_cents for op in payload.ops]
+
+        async with app.state.pool.acquire() as conn:
+            async with conn.transaction():
+                updated = await conn.fetch(SQL_BULK_UPDATE_BALANCES, account_ids, deltas)
+
+                balances = {row['account_id']: row['opening_balance_cents'] for row in updated}
+                if len(balances) < len(set(account_ids)):
+                    raise HTTPException(status_code=404, detail="Account not found")
+
+                records = []
+                for op, delta in zip(payload.ops, deltas):
+                    balances[op.account_id] += delta
+                    if balances[op.account_id] < 0:
+                        raise HTTPException(status_code=400, detail=f"Insufficient funds in account {op.account_id}")
+                    records.append((op.account_id, op.transaction_type, op.amount_cents, balances[op.account_id]))
 
+                if len(records) >= BULK_COPY_THRESHOLD:
+                    await conn.copy_records_to_table(
+                        'transactions',
+                        records=records,
+                        columns=['account_id', 'transaction_type', 'amount_cents', 'balance_after_cents']
+                    )
+                else:
+                    await conn.executemany(SQL_INSERT_TRANSACTION, records)
 
-@app.get("/accounts/{account_id}/balance")
+                await notify_balance_changed(conn, updated)
+
+        await cache_accounts(*updated)
+
+        return {
+            "message": "Bulk transactions successful",
+            "transactions_processed": len(records),
+            "balances": [
+                {"account_id": account_id, "new_balance_cents": balance}
+                for account_id, balance in balances.items()
+            ]
+        }
+
+    except HTTPException:
+        raise
+    except (asyncpg.LockNotAvailableError, asyncpg.QueryCanceledError):
+        raise HTTPException(status_code=409, detail="Account busy, retry")
+    except asyncpg.NumericValueOutOfRangeError:
+        raise HTTPException(status_code=422, detail="Balance would exceed the maximum")
+    except Exception:
+        logger.exception("Error processing bulk transactions")
+        raise HTTPException(status_code=500, detail="Error processing bulk transactions")
+
+
+@app.get("/accounts/{account_id}/balance", response_model=AccountResponse)
 async def get_balance(account_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
     try:
-        cursor.execute("""
-            SELECT account_id, account_holder_name, balance, created_at
-            FROM accounts
-            WHERE account_id = %s
-        """, (account_id,))
-        
-        account = cursor.fetchone()
-        
+        cached = await get_cached_account_json(account_id)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+
+        async with app.state.pool.acquire() as conn:
+            account = await conn.fetchrow(SQL_SELECT_ACCOUNT, account_id)
+
         if not account:
             raise HTTPException(status_code=404, detail="Account not found")
-        
-        return account
-        
+
+        await cache_accounts(account)
+        return dict(account)
+
     except HTTPException:
         raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving balance: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
-
-
-@app.get("/accounts/{account_id}/transactions", response_model=List[TransactionResponse])
-async def get_transactions(account_id: int, limit: Optional[int] = 10):
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
+    except Exception:
+        logger.exception("Error retrieving balance")
+        raise HTTPException(status_code=500, detail="Error retrieving balance")
+
+
+@app.get("/accounts/{account_id}/balance_only")
+async def get_balance_only(account_id: int):
     try:
-        cursor.execute("SELECT account_id FROM accounts WHERE account_id = %s", (account_id,))
-        if not cursor.fetchone():
+        cached = await get_cached_account_json(account_id)
+        if cached is not None:
+            return {"account_id": account_id, "balance_cents": orjson.loads(cached)["balance_cents"]}
+
+        if app.state.redis is None:
+            async with app.state.pool.acquire() as conn:
+                balance_cents = await conn.fetchval(SQL_SELECT_BALANCE_CENTS, account_id)
+        else:
+            # Fill the cache with the versioned row so pollers that only use this
+            # endpoint stay off PostgreSQL after the entry expires.
+            async with app.state.pool.acquire() as conn:
+                account = await conn.fetchrow(SQL_SELECT_ACCOUNT, account_id)
+            if account:
+                await cache_accounts(account)
+            balance_cents = account['balance_cents'] if account else None
+
+        if balance_cents is None:
             raise HTTPException(status_code=404, detail="Account not found")
-        
-        cursor.execute("""
-            SELECT transaction_id, account_id, transaction_type, amount, balance_after, timestamp
-            FROM transactions
-            WHERE account_id = %s
-            ORDER BY timestamp DESC
-            LIMIT %s
-        """, (account_id, limit))
-        
-        transactions = cursor.fetchall()
-        
-        return transactions
-        
+
+        return {"account_id": account_id, "balance_cents": balance_cents}
+
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error retrieving balance")
+        raise HTTPException(status_code=500, detail="Error retrieving balance")
+
+
+@app.get("/accounts/{account_id}/transactions")
+async def get_transactions(account_id: int, limit: int = Query(10, ge=1, le=10000)):
+    try:
+        async with app.state.pool.acquire() as conn:
+            first_page = await conn.fetch(SQL_SELECT_TRANSACTIONS, account_id, min(limit, TRANSACTION_STREAM_CHUNK))
+
+            if not first_page and not await conn.fetchval(SQL_ACCOUNT_EXISTS, account_id):
+                raise HTTPException(status_code=404, detail="Account not found")
+
     except HTTPException:
         raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving transactions: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
+    except Exception:
+        logger.exception("Error retrieving transactions")
+        raise HTTPException(status_code=500, detail="Error retrieving transactions")
+
+    # Only the rest of a long history needs a connection, and it is taken once
+    # the response starts iterating, so a client that disconnects before then
+    # never ties one up.
+    async def stream_rows(rows):
+        yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+        remaining = limit - len(rows)
+        if remaining <= 0 or len(rows) < TRANSACTION_STREAM_CHUNK:
+            return
+
+        try:
+            async with app.state.pool.acquire() as conn:
+                # Server-side cursors only live inside a transaction.
+                async with conn.transaction(readonly=True):
+                    cursor = await conn.cursor(
+                        SQL_SELECT_TRANSACTIONS_BEFORE,
+                        account_id, rows[-1]['timestamp'], rows[-1]['transaction_id'], remaining
+                    )
+                    while rows := await cursor.fetch(TRANSACTION_STREAM_CHUNK):
+                        yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+        except Exception:
+            logger.exception("Error streaming transactions")
+            raise
+
+    return StreamingResponse(stream_rows(first_page), media_type="application/x-ndjson")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host = os.getenv("HOST"), port = int(os.getenv("PORT")))
\ No newline at end of file
+    uvicorn.run(
+        "server:app",
+        host = env("HOST", "127.0.0.1"),
+        port = int(env("PORT", "8080")),
+        loop = "auto",
+        http = "httptools",
+        workers = int(env("WORKERS", min(os.cpu_count() or 1, 4)))
+    )
\ No newline at end of file